@@ -0,0 +1,299 @@
+"""Headless benchmark of app.py over every page and widget combination.
+
+Drives the app through streamlit's AppTest against synthetic datasets with the
+Invistico schema and writes a JSON report that can be diffed between versions:
+
+    python benchmark.py --rows 100000 1000000 10000000 --output bench_report.json
+    python benchmark.py --compare bench_report.json --threshold 0.2
+
+Each scenario runs in a fresh process so peak RSS and cold-cache timings are not
+shared between scenarios. Peak RSS uses the `resource` module (Linux/macOS).
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+BENCH_DIR = ".bench"
+GENERATE_CHUNK_ROWS = 1_000_000
+PAGES = ["Welcome", "Discover the Data", "Unveil Insights", "Our Journey"]
+
+SERVICE_RATINGS = [
+    'Seat comfort',
+    'Departure/Arrival time convenient',
+    'Food and drink',
+    'Gate location',
+    'Inflight wifi service',
+    'Inflight entertainment',
+    'Online support',
+    'Ease of Online booking',
+    'On-board service',
+    'Leg room service',
+    'Baggage handling',
+    'Checkin service',
+    'Cleanliness',
+    'Online boarding',
+]
+
+
+# Function to generate one chunk of synthetic survey rows with the Invistico schema
+def synthetic_chunk(rng, rows: int):
+    satisfied = rng.random(rows) < 0.55
+    data = {
+        'satisfaction': np.where(satisfied, 'satisfied', 'dissatisfied'),
+        'Gender': rng.choice(['Female', 'Male'], rows),
+        'Customer Type': rng.choice(['Loyal Customer', 'disloyal Customer'], rows, p=[0.82, 0.18]),
+        'Age': rng.integers(7, 86, rows),
+        'Type of Travel': rng.choice(['Business travel', 'Personal Travel'], rows, p=[0.69, 0.31]),
+        'Class': rng.choice(['Business', 'Eco', 'Eco Plus'], rows, p=[0.48, 0.45, 0.07]),
+        'Flight Distance': (rng.gamma(4.0, 500.0, rows) + 50).astype(int),
+    }
+    for column in SERVICE_RATINGS:
+        # Satisfied passengers rate a little higher, like in the real survey
+        data[column] = np.clip(rng.integers(0, 6, rows) + (satisfied & (rng.random(rows) < 0.3)), 0, 5)
+    departure = rng.exponential(15.0, rows).astype(int)
+    arrival = np.clip(departure + rng.normal(0, 5, rows), 0, None).round()
+    arrival[rng.random(rows) < 0.003] = np.nan
+    data['Departure Delay in Minutes'] = departure
+    data['Arrival Delay in Minutes'] = arrival
+    return pd.DataFrame(data)
+
+
+# Function to write (once) a synthetic CSV with the given number of rows
+def synthetic_dataset(rows: int, seed: int = 42):
+    path = os.path.abspath(os.path.join(BENCH_DIR, f"invistico_{rows}.csv"))
+    if os.path.exists(path):
+        return path
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    tmp_path = f"{path}.tmp"
+    for start in range(0, rows, GENERATE_CHUNK_ROWS):
+        chunk = synthetic_chunk(rng, min(GENERATE_CHUNK_ROWS, rows - start))
+        chunk.to_csv(tmp_path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+# Function to start the app on a page with the dataset at `data_path`
+def start_app(page: str, data_path: str, timeout: float):
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["INVISTICO_DATA_PATH"] = data_path
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.query_params["page"] = page
+    return at
+
+
+# Function to list the page's own widgets of one kind, leaving out the shared passenger filters
+def page_widgets(at, kind: str):
+    return [widget for widget in getattr(at, kind) if not (widget.key or "").startswith("filter_")]
+
+
+# Function to list every widget combination of every page, by looking at the widgets the app renders
+def discover_scenarios(data_path: str, timeout: float):
+    scenarios = []
+    for page in PAGES:
+        at = start_app(page, data_path, timeout)
+        at.run()
+        if page_widgets(at, "multiselect"):
+            options = page_widgets(at, "multiselect")[0].options
+            for size in range(len(options) + 1):
+                for subset in itertools.combinations(options, size):
+                    scenarios.append({"page": page, "multiselect": list(subset)})
+        elif page_widgets(at, "selectbox"):
+            for option in page_widgets(at, "selectbox")[0].options:
+                page_widgets(at, "selectbox")[0].set_value(option)
+                at.run()
+                if at.radio:
+                    scenarios += [{"page": page, "selectbox": option, "radio": choice} for choice in at.radio[0].options]
+                elif len(page_widgets(at, "selectbox")) > 1:
+                    # An insight with a picker of its own, like the service of the rating distribution
+                    detail = page_widgets(at, "selectbox")[1]
+                    scenarios += [{"page": page, "selectbox": option, "detail": choice} for choice in detail.options]
+                else:
+                    scenarios.append({"page": page, "selectbox": option})
+        else:
+            scenarios.append({"page": page})
+    return scenarios
+
+
+# Function to apply a scenario's widget state to a running app
+def apply_widgets(at, scenario: dict):
+    if "multiselect" in scenario:
+        page_widgets(at, "multiselect")[0].set_value(scenario["multiselect"])
+    if "selectbox" in scenario:
+        page_widgets(at, "selectbox")[0].set_value(scenario["selectbox"])
+        # The radio and detail pickers only exist once their insight is showing
+        if "radio" in scenario:
+            at.run()
+            at.radio[0].set_value(scenario["radio"])
+        if "detail" in scenario:
+            at.run()
+            page_widgets(at, "selectbox")[1].set_value(scenario["detail"])
+    return at
+
+
+# Function to call `function` in a worker process and send back its result. Every
+# AppTest run happens in a worker: the script runner replaces __main__ with the app.
+def worker_main(function, args, results):
+    try:
+        results.put(function(*args))
+    except Exception as error:
+        results.put({"error": repr(error)})
+
+
+# Function to run a scenario cold, then rerun it and record latency, memory and payload size
+def time_scenario(data_path: str, scenario: dict, reruns: int, timeout: float):
+    at = start_app(scenario["page"], data_path, timeout)
+    start = time.perf_counter()
+    at.run()
+    apply_widgets(at, scenario).run()
+    cold = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+
+    if at.exception:
+        return {"error": at.exception[0].message}
+    charts = at.get("plotly_chart")
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return {
+        "cold_seconds": cold,
+        "rerun_seconds": {
+            "p50": float(np.percentile(latencies, 50)),
+            "p90": float(np.percentile(latencies, 90)),
+            "p99": float(np.percentile(latencies, 99)),
+            "max": max(latencies),
+        },
+        "peak_rss_bytes": peak_rss,
+        "figures": len(charts),
+        "figure_bytes": sum(len(chart.proto.spec) for chart in charts),
+    }
+
+
+# Function to run `function` in a fresh process and wait for its result
+def in_worker(function, *args, timeout: float):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    worker = context.Process(target=worker_main, args=(function, args, results))
+    worker.start()
+    try:
+        outcome = results.get(timeout=timeout)
+    except queue.Empty:
+        worker.terminate()
+        outcome = {"error": "timed out"}
+    worker.join()
+    return outcome
+
+
+# Function to identify the code version being benchmarked
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(APP_PATH), capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Function to name a scenario in reports and comparisons
+def scenario_key(result: dict):
+    scenario = result["scenario"]
+    widgets = scenario.get("multiselect", [scenario.get("selectbox"), scenario.get("radio"), scenario.get("detail")])
+    return f"{result['rows']} | {scenario['page']} | {', '.join(str(w) for w in widgets if w is not None) or '-'}"
+
+
+# Function to compare a report against a baseline and list the scenarios that got slower or bigger
+def compare_reports(baseline: dict, report: dict, threshold: float):
+    previous = {scenario_key(result): result for result in baseline["results"] if "error" not in result}
+    regressions = []
+    for result in report["results"]:
+        old = previous.get(scenario_key(result))
+        if old is None or "error" in result:
+            continue
+        for metric, new_value, old_value in [
+            ("rerun p50", result["rerun_seconds"]["p50"], old["rerun_seconds"]["p50"]),
+            ("rerun p90", result["rerun_seconds"]["p90"], old["rerun_seconds"]["p90"]),
+            ("cold", result["cold_seconds"], old["cold_seconds"]),
+            ("peak RSS", result["peak_rss_bytes"], old["peak_rss_bytes"]),
+            ("figure bytes", result["figure_bytes"], old["figure_bytes"]),
+        ]:
+            if old_value and (new_value - old_value) / old_value > threshold:
+                regressions.append(f"{scenario_key(result)}: {metric} {old_value:.4g} -> {new_value:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--reruns", type=int, default=5, help="timed reruns per scenario after the cold run")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed for a single script run")
+    parser.add_argument("--page", choices=PAGES, action="append", help="only benchmark these pages")
+    parser.add_argument("--output", default="bench_report.json")
+    parser.add_argument("--compare", help="baseline report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative increase that counts as a regression")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "reruns": args.reruns,
+        },
+        "results": [],
+    }
+    scenarios = None
+    for rows in sorted(args.rows):
+        data_path = synthetic_dataset(rows)
+        if scenarios is None:
+            scenarios = in_worker(discover_scenarios, data_path, args.timeout, timeout=args.timeout * 20)
+            if isinstance(scenarios, dict):
+                sys.exit(f"Could not list the app's scenarios: {scenarios['error']}")
+            scenarios = [s for s in scenarios if not args.page or s["page"] in args.page]
+        for scenario in scenarios:
+            outcome = in_worker(time_scenario, data_path, scenario, args.reruns, args.timeout, timeout=args.timeout * (args.reruns + 2))
+            result = {"rows": rows, "scenario": scenario, **outcome}
+            report["results"].append(result)
+            if "error" in result:
+                print(f"{scenario_key(result)}: ERROR {result['error']}", flush=True)
+            else:
+                print(
+                    f"{scenario_key(result)}: cold {result['cold_seconds']:.2f}s, "
+                    f"p50 {result['rerun_seconds']['p50'] * 1000:.0f}ms, p90 {result['rerun_seconds']['p90'] * 1000:.0f}ms, "
+                    f"RSS {result['peak_rss_bytes'] / 2 ** 20:.0f}MB, figures {result['figure_bytes'] / 1024:.1f}KB",
+                    flush=True,
+                )
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_reports(json.load(f), report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Export every page and option combination of app.py as static HTML.
+
+Renders each scenario headlessly through streamlit's AppTest, like benchmark.py,
+and writes one HTML page per scenario with its text and Plotly figures:
+
+    python export_static.py --output snapshot --jobs 4
+
+The pages link to each other and only need a plain file server or CDN. They load
+plotly.min.js from the same folder, or embed it with --inline-plotlyjs. Renders
+run in parallel worker processes that share the dataset copy the first render
+builds: the Parquet copy partitioned by Class that DuckDB queries or, with
+INVISTICO_QUERY_BACKEND=pandas, the Arrow copy every worker memory-maps. Pages
+always show exact figures, never progressive estimates.
+"""
+import argparse
+import html
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+import plotly.offline
+from markdown_it import MarkdownIt
+
+from benchmark import PAGES, apply_widgets, discover_scenarios, in_worker, start_app
+
+# Streamlit renders CommonMark with raw HTML allowed (the app's cards use it)
+MARKDOWN = MarkdownIt("commonmark", {"html": True}).enable("table")
+
+PAGE_CSS = """
+body { margin: 0; background: #0e1117; color: #fafafa; font-family: "Source Sans Pro", sans-serif; line-height: 1.6; }
+nav { display: flex; gap: 1.5rem; padding: 1rem 2rem; background: #262730; }
+nav a, .views a { color: #fafafa; text-decoration: none; }
+nav a.current { color: #02ab21; font-weight: bold; }
+main { max-width: 1200px; margin: 0 auto; padding: 1rem 2rem 3rem; }
+.views { font-size: 0.9rem; color: #a3a8b8; }
+.views a { margin-right: 1rem; border-bottom: 1px dotted #a3a8b8; }
+.views a.current { color: #02ab21; }
+.flex_container:has(> .column) { display: flex; gap: 1rem; }
+.column { flex: 1; min-width: 0; }
+.caption, footer { color: #a3a8b8; font-size: 0.85rem; }
+.alert { padding: 0.75rem 1rem; border-radius: 0.5rem; background: #3b3a1f; }
+.chart { width: 100%; min-height: 450px; }
+footer { text-align: center; padding: 2rem; }
+"""
+
+
+# Function to turn the text of a scenario into a file name
+def scenario_file(scenario: dict, default: bool):
+    if scenario["page"] == PAGES[0] and default:
+        return "index.html"
+    parts = [scenario["page"]] + (["default"] if default else scenario_options(scenario))
+    return "--".join(re.sub(r"[^a-z0-9]+", "-", part.lower()).strip("-") or "none" for part in parts) + ".html"
+
+
+# Function to list the options a scenario picked, in the order the page shows them
+def scenario_options(scenario: dict):
+    if "multiselect" in scenario:
+        return scenario["multiselect"] or ["nothing selected"]
+    return [scenario[widget] for widget in ("selectbox", "radio", "detail") if widget in scenario]
+
+
+# Function to name a scenario in progress messages
+def scenario_name(scenario: dict):
+    return f"{scenario['page']} | {', '.join(scenario_options(scenario)) or '-'}"
+
+
+# Function to write a link, highlighted when it points at the page being written
+def link(href: str, label: str, current: bool):
+    attributes = ' class="current"' if current else ""
+    return f'<a href="{href}"{attributes}>{html.escape(label)}</a>'
+
+
+# Function to convert one node of the rendered element tree to HTML. Widgets, custom
+# components and anything without a static form are left out.
+def node_html(node, figures: list):
+    from streamlit.testing.v1 import element_tree
+
+    if isinstance(node, element_tree.Block):
+        inner = "".join(node_html(child, figures) for child in node.children.values())
+        return f'<div class="{html.escape(node.type)}">{inner}</div>' if inner else ""
+    if isinstance(node, element_tree.HeadingBase):
+        tag = {"title": "h1", "header": "h2", "subheader": "h3"}.get(node.type, "h2")
+        return f"<{tag}>{MARKDOWN.renderInline(node.value)}</{tag}>"
+    if isinstance(node, element_tree.Caption):
+        return f'<div class="caption">{MARKDOWN.render(node.value)}</div>'
+    if isinstance(node, element_tree.Markdown):
+        return MARKDOWN.render(node.value)
+    if isinstance(node, element_tree.AlertBase):
+        return f'<div class="alert">{MARKDOWN.render(node.value)}</div>'
+    if isinstance(node, element_tree.Divider):
+        return "<hr>"
+    if node.type == "plotly_chart":
+        # Plotly's JSON escapes "<", so the spec is safe to embed in a script as it is
+        chart_id = f"chart-{len(figures)}"
+        figures.append(chart_id)
+        return (
+            f'<div id="{chart_id}" class="chart"></div><script>(function (figure) {{'
+            f'Plotly.newPlot("{chart_id}", figure.data, figure.layout, {{"responsive": true, "displaylogo": false}});'
+            f"}})({node.proto.spec});</script>"
+        )
+    return ""
+
+
+# Function to render one scenario in a worker process and send back its page body. Errors,
+# including AppTest's timeout, are sent back too so one bad render does not stop the export.
+def render_scenario(data_path: str, scenario: dict, timeout: float):
+    start = time.perf_counter()
+    try:
+        at = start_app(scenario["page"], data_path, timeout)
+        at.run()
+        apply_widgets(at, scenario).run()
+    except Exception as error:
+        return {"scenario": scenario, "error": repr(error)}
+    if at.exception:
+        return {"scenario": scenario, "error": at.exception[0].message}
+    figures = []
+    body = node_html(at.main, figures)
+    return {"scenario": scenario, "body": body, "figures": len(figures), "seconds": time.perf_counter() - start}
+
+
+# Function to wrap a rendered body in a standalone page with links to every other page and view
+def page_html(result: dict, files: dict, defaults: dict, plotly_js: str, data_path: str):
+    scenario = result["scenario"]
+    current = files[json.dumps(scenario, sort_keys=True)]
+    nav = "".join(link(defaults[page], page, page == scenario["page"]) for page in PAGES if page in defaults)
+    views = [
+        (file, ", ".join(scenario_options(json.loads(key))))
+        for key, file in files.items()
+        if json.loads(key)["page"] == scenario["page"]
+    ]
+    views_html = ""
+    if len(views) > 1:
+        views_html = '<p class="views">Views: ' + "".join(link(file, label, file == current) for file, label in views) + "</p>"
+    snapshot = time.strftime("%Y-%m-%d %H:%M", time.localtime())
+    return (
+        "<!DOCTYPE html>\n"
+        '<html lang="en"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        f"<title>{html.escape(scenario['page'])} | Invistico Airline</title>"
+        f"{plotly_js}<style>{PAGE_CSS}</style></head>"
+        f"<body><nav>{nav}</nav><main>{views_html}{result['body']}</main>"
+        f"<footer>Static snapshot of {html.escape(os.path.basename(data_path))}, taken {snapshot}.</footer>"
+        "</body></html>\n"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=os.environ.get("INVISTICO_DATA_PATH", "Invistico_Airline.csv"))
+    parser.add_argument("--output", default="snapshot", help="folder to write the pages to")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="pages rendered in parallel")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed for a single script run")
+    parser.add_argument("--page", choices=PAGES, action="append", help="only export these pages")
+    parser.add_argument("--inline-plotlyjs", action="store_true", help="embed plotly.js in every page")
+    args = parser.parse_args()
+    data_path = os.path.abspath(args.data)
+
+    # Exact figures only: the workers inherit this and skip the progressive first pass
+    os.environ["INVISTICO_PROGRESSIVE_MIN_ROWS"] = str(sys.maxsize)
+    # Listing the scenarios also builds the dataset copy every worker reads (see the docstring)
+    scenarios = in_worker(discover_scenarios, data_path, args.timeout, timeout=args.timeout * 20)
+    if isinstance(scenarios, dict):
+        sys.exit(f"Could not list the app's scenarios: {scenarios['error']}")
+    scenarios = [s for s in scenarios if not args.page or s["page"] in args.page]
+
+    # One fresh process per render: AppTest replaces __main__, so workers are not reused
+    context = multiprocessing.get_context("spawn")
+    rendered = []
+    with context.Pool(max(args.jobs, 1), maxtasksperchild=1) as pool:
+        tasks = [(data_path, scenario, args.timeout) for scenario in scenarios]
+        for result in pool.starmap(render_scenario, tasks):
+            if "error" in result:
+                print(f"{scenario_name(result['scenario'])}: ERROR {result['error']}", flush=True)
+            else:
+                rendered.append(result)
+
+    # Pages only link to views that rendered, so a failed render leaves no dead links
+    defaults = {}
+    files = {}
+    for result in rendered:
+        scenario = result["scenario"]
+        default = scenario["page"] not in defaults
+        files[json.dumps(scenario, sort_keys=True)] = scenario_file(scenario, default)
+        if default:
+            defaults[scenario["page"]] = files[json.dumps(scenario, sort_keys=True)]
+
+    os.makedirs(args.output, exist_ok=True)
+    if args.inline_plotlyjs:
+        plotly_js = f"<script>{plotly.offline.get_plotlyjs()}</script>"
+    else:
+        with open(os.path.join(args.output, "plotly.min.js"), "w", encoding="utf-8") as f:
+            f.write(plotly.offline.get_plotlyjs())
+        plotly_js = '<script src="plotly.min.js"></script>'
+
+    for result in rendered:
+        file = files[json.dumps(result["scenario"], sort_keys=True)]
+        with open(os.path.join(args.output, file), "w", encoding="utf-8") as f:
+            f.write(page_html(result, files, defaults, plotly_js, data_path))
+        print(f"{scenario_name(result['scenario'])}: {file} ({result['figures']} figures, {result['seconds']:.2f}s)", flush=True)
+
+    failed = len(scenarios) - len(rendered)
+    print(f"Wrote {len(rendered)} pages to {args.output}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()